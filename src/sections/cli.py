@@ -1,3 +1,6 @@
+from concurrent.futures import ThreadPoolExecutor
+from csv import writer as csv_writer
+from io import StringIO
 from os import makedirs
 from pathlib import Path
 from typing import Optional
@@ -10,10 +13,13 @@ from .input import (
     read_and_process_sections,
     read_short_rivername_mapping,
 )
-from .schema import Mannings, Section
+from .schema import ManningsTable, Section
 from .settings import get_settings
 from .utils import console, create_basic_logger, err_console, package, uopen
 
+_WRITE_BUFFER_SIZE = 1 << 20
+_CSV_HEADER = "REF,SECTION NUMBER,NAME,DATE,CHAINAGE,OFFSET/BRG,LEVEL,EASTING,NORTHING,BANK,MANNINGS,GROUND,VEGETATION\n"
+
 # Allow invocation without subcommand so --version option does not produce an error
 interface = Typer()
 
@@ -73,12 +79,11 @@ def _main(
         raise Exit(1) from err
 
     try:
-        sections = read_and_process_sections(data, mannings)
+        rivers = generate_rivers(read_and_process_sections(data, mannings))
     except ValueError as err:
         err_console.print(f"Parsing sections in '{data.name}' failed")
         raise Exit(1) from err
     mapping = read_short_rivername_mapping(river_names)
-    rivers = generate_rivers(sections)
 
     console.print_json(
         data=dict(
@@ -92,23 +97,52 @@ def _main(
     write_rivers_to_csv(mapping, rivers, output_dir, mannings)
 
 
+def _write_river_to_csv(
+    file_path: Path,
+    river: list[Section],
+    mapping: dict[int, str],
+    mannings: ManningsTable,
+):
+    buffer = StringIO()
+    buffer.write(_CSV_HEADER)
+    writer = csv_writer(buffer, lineterminator="\n")
+
+    for section in river:
+        section.write_csv(writer, mapping, mannings)
+
+    # Write the whole river in one call rather than a write per row
+    with uopen(file_path, mode="w", buffering=_WRITE_BUFFER_SIZE) as file:
+        file.write(buffer.getvalue())
+
+
 def write_rivers_to_csv(
     mapping: dict[int, str],
     rivers: dict[int, list[Section]],
     output_dir: Path,
-    mannings: Mannings,
+    mannings: ManningsTable,
 ):
-    for riv_number, river in rivers.items():
-        file_path = output_dir / f"{mapping[riv_number]}.csv"
-        with uopen(file_path, mode="w") as file:
-
-            file.write(
-                "REF,SECTION NUMBER,NAME,DATE,CHAINAGE,OFFSET/BRG,LEVEL,EASTING,NORTHING,BANK,MANNINGS,GROUND,VEGETATION\n"
+    # Rivers sharing a short name share a file, and as when writing them in turn the
+    # last river wins. Keying by path leaves one job per file, so the writes can overlap
+    files = {
+        output_dir / f"{mapping[riv_number]}.csv": river
+        for riv_number, river in rivers.items()
+    }
+
+    with ThreadPoolExecutor(max_workers=min(32, max(1, len(files)))) as executor:
+        futures = [
+            executor.submit(
+                _write_river_to_csv,
+                file_path,
+                river,
+                mapping,
+                mannings,
             )
+            for file_path, river in files.items()
+        ]
 
-            for section in river:
-                for record in section.csv_records(mapping, mannings):
-                    file.write(f"{record}\n")
+        # Re-raise the first error from any of the writers
+        for future in futures:
+            future.result()
 
 
 def main():
@@ -1,39 +1,58 @@
-from csv import reader
+from collections import defaultdict
 from os import PathLike
-from typing import Optional
+from re import MULTILINE
+from re import compile as re_compile
+from typing import Iterable, Iterator, Optional
 
-from .schema import DEFAULT_MANNINGS, Mannings, Section, SectionRaw
+from .schema import DEFAULT_MANNINGS, Mannings, ManningsTable, Section, SectionRaw
 from .utils import err_console, uopen
 
+_CROSS_SECTION_IDS = frozenset({"XSS", "XSN"})
+_METADATA_IDS = frozenset(
+    {
+        "NEWSEC",
+        "SECDATE",
+        "BEDMATERIAL",
+        "SECBEARING",
+        "SECCOORDS",
+    }
+)
+# Matches "SHORT_RIVERNAME<number>=<name>" lines, capturing the number and name
+_SHORT_RIVERNAME = re_compile(
+    r"^[ \t]*SHORT_RIVERNAME(\S*?)[ \t]*=[ \t]*(.*?)[ \t]*$",
+    flags=MULTILINE,
+)
+
+
+def read_sections(file_name: PathLike) -> Iterator[list[str]]:
+    section: list[str] = []
 
-def read_sections(file_name: PathLike) -> list[list[str]]:
-    sections: list[list[str]] = []
     with uopen(file_name) as file:
-        # Remove empty lines
-        lines = [line.strip() for line in file.readlines()]
-        lines = [line for line in lines if line != ""]
+        # Iterate the file rather than reading it whole, so only one section is held
+        for line in file:
+            line = line.strip()
 
-        cross_sections: list[str] = []
+            # Remove empty lines
+            if line == "":
+                continue
 
-        for index, line in enumerate(lines, start=1):
-            cross_sections.append(line)
+            # Yield the previous section when we reach the start of the next one
+            if line.startswith("NEWSEC") and section:
+                yield section
+                section = []
 
-            # Append the section when if we are at the last line of either the file or the section
-            if index == len(lines) or lines[index].startswith("NEWSEC"):
-                sections.append(cross_sections.copy())
-                cross_sections.clear()
+            section.append(line)
 
-    return sections
+    if section:
+        yield section
 
 
 def _string_or_none(input: str) -> Optional[str]:
     return input.strip() if input != "" else None
 
 
-def process_raw_sections(sections: list[list[str]]) -> list[SectionRaw]:
+def process_raw_sections(sections: Iterable[list[str]]) -> Iterator[SectionRaw]:
     """Strip whitespace"""
-    processed_sections: list[SectionRaw] = []
-
     for sec_index, section_in in enumerate(
         iterable=sections,
         start=1,
@@ -41,7 +60,9 @@ def process_raw_sections(sections: list[list[str]]) -> list[SectionRaw]:
 
         cross_sections: list[list[str]] = []
         metadata: dict[str, list[Optional[str]]] = {}
-        for index, row in enumerate(iterable=reader(section_in), start=1):
+        for index, line in enumerate(iterable=section_in, start=1):
+            # The DAT format is comma separated without any quoting
+            row = line.split(",")
 
             len_row = len(row)
 
@@ -57,119 +78,94 @@ def process_raw_sections(sections: list[list[str]]) -> list[SectionRaw]:
             if identifier is None:
                 raise ValueError("first element of a record was empty")
 
-            if identifier in ["XSS", "XSN"]:
-                if any([x is None for x in row_nones]):
+            if identifier in _CROSS_SECTION_IDS:
+                if any(x is None for x in row_nones):
                     raise ValueError(
                         f"an element in a cross section was None: {row_nones}"
                     )
                 cross_sections.append(row_nones[1:])  # type: ignore
-            else:
-                if identifier in [
-                    "NEWSEC",
-                    "SECDATE",
-                    "BEDMATERIAL",
-                    "SECBEARING",
-                    "SECCOORDS",
-                ]:
-                    if metadata.get(identifier) is not None:
-                        raise ValueError(f"metadata key already exists {identifier}")
-                    metadata[identifier] = row_nones[1:]
-
-        section = SectionRaw(
+            elif identifier in _METADATA_IDS:
+                if metadata.get(identifier) is not None:
+                    raise ValueError(f"metadata key already exists {identifier}")
+                metadata[identifier] = row_nones[1:]
+
+        yield SectionRaw(
             metadata=metadata,
             cross_sections=cross_sections,
         )
-        processed_sections.append(section)
-
-    return processed_sections
 
 
 def process_sections(
-    sections_raw: list[SectionRaw],
-    mannings: Mannings,
-) -> list[Section]:
-    sections: list[Section] = []
-
+    sections_raw: Iterable[SectionRaw],
+    mannings: ManningsTable,
+) -> Iterator[Section]:
     for section_raw in sections_raw:
         try:
-            sections.append(Section.from_raw(section_raw, mannings))
+            yield Section.from_raw(section_raw, mannings)
         except ValueError as err:
             msg = f"Couldn't parse the following section because: {err}"
             err_console.print(msg)
             err_console.print_json(data=section_raw.metadata)
             raise ValueError("Parsing section failed") from err
 
-    return sections
-
 
 def read_short_rivername_mapping(file_name: PathLike) -> dict[int, str]:
     mapping: dict[int, str] = {}
 
     with uopen(file_name) as file:
+        text = file.read()
 
-        # Remove empty lines
-        lines = [
-            line.strip()
-            for line in file.readlines()
-            if line.strip().startswith("SHORT_RIVERNAME")
-        ]
-
-        for line in lines:
-            split_line = line.split(sep="=")
-            try:
-                number = int(split_line[0][-1])
-            except ValueError as err:
-                raise ValueError(
-                    f"Could not parse integer from short river name {line}"
-                ) from err
-
-            name = split_line[1]
-            mapping[number] = name
+    for match in _SHORT_RIVERNAME.finditer(text):
+        number, name = match.groups()
+        try:
+            mapping[int(number)] = name
+        except ValueError as err:
+            raise ValueError(
+                f"Could not parse integer from short river name {match.group().strip()}"
+            ) from err
 
     return mapping
 
 
-def read_and_process_sections(data: PathLike, mannings: Mannings) -> list[Section]:
-    sections = read_sections(data)
+def _read_raw_sections(data: PathLike) -> Iterator[SectionRaw]:
     try:
-        raw_sections = process_raw_sections(sections)
+        yield from process_raw_sections(read_sections(data))
     except ValueError as err:
         err_console.print(f"Could not parse '{data}' because: {err}")
         raise err
 
-    return process_sections(raw_sections, mannings)
 
+def read_and_process_sections(
+    data: PathLike, mannings: ManningsTable
+) -> Iterator[Section]:
+    """Lazily read and process sections, so parsing errors are raised during iteration"""
+    return process_sections(_read_raw_sections(data), mannings)
 
-def read_and_process_mannings(mannings_file: Optional[PathLike] = None) -> Mannings:
-    mannings = DEFAULT_MANNINGS
 
-    if mannings_file is not None:
+def read_and_process_mannings(
+    mannings_file: Optional[PathLike] = None,
+) -> ManningsTable:
+    if mannings_file is None:
+        return ManningsTable.from_mannings(DEFAULT_MANNINGS)
 
-        with open(mannings_file, mode="rb") as file:
-            json_data = file.read()
-            try:
-                overrides = Mannings.model_validate_json(
-                    json_data,
-                    strict=True,
-                )
-
-            except ValueError as err:
-                raise err
+    # pydantic-core parses and validates the JSON in one pass, without building
+    # an intermediate dict in Python
+    with open(mannings_file, mode="rb") as file:
+        overrides = Mannings.validate_json(file.read())
 
-        mannings.surface |= overrides.surface  # pylint: disable=no-member
-        mannings.vegetation |= overrides.vegetation  # pylint: disable=no-member
+    # Merge into a new instance, leaving the defaults untouched
+    mannings = Mannings(
+        surface=DEFAULT_MANNINGS.surface | overrides.surface,
+        vegetation=DEFAULT_MANNINGS.vegetation | overrides.vegetation,
+    )
 
-    return mannings
+    return ManningsTable.from_mannings(mannings)
 
 
-def generate_rivers(sections: list[Section]):
-    rivers: dict[int, list[Section]] = {}
+def generate_rivers(sections: Iterable[Section]) -> dict[int, list[Section]]:
+    rivers: defaultdict[int, list[Section]] = defaultdict(list)
 
     for section in sections:
-        riv_number = section.river_num
-
-        if rivers.get(riv_number) is None:
-            rivers[riv_number] = []
+        rivers[section.river_num].append(section)
 
-        rivers[riv_number].append(section)
-    return rivers
+    return dict(rivers)
@@ -1,18 +1,33 @@
-from typing import Optional, Tuple
+from dataclasses import dataclass, field
+from typing import Any, Iterable, Optional, Protocol
 
-from pydantic import BaseModel, ConfigDict
+from pydantic import ConfigDict, TypeAdapter
 
 
-class BedManning(BaseModel):
+@dataclass(slots=True)
+class BedManning:
     name: str
     manning: float
-    model_config = ConfigDict(extra="forbid")
+    __pydantic_config__ = ConfigDict(extra="forbid")
 
 
-class Mannings(BaseModel):
+@dataclass(slots=True)
+class Mannings:
     surface: dict[str, BedManning]
     vegetation: dict[str, BedManning]
-    model_config = ConfigDict(extra="forbid")
+    __pydantic_config__ = ConfigDict(extra="forbid")
+
+    @classmethod
+    def validate_json(cls, json_data: bytes) -> "Mannings":
+        """Validate mannings loaded from JSON. Only used when reading a mannings file
+
+        Extra keys are rejected as unexpected_keyword_argument errors, which is how
+        pydantic reports them for dataclasses, rather than extra_forbidden.
+        """
+        return _MANNINGS_ADAPTER.validate_json(json_data, strict=True)
+
+
+_MANNINGS_ADAPTER = TypeAdapter(Mannings)
 
 
 _SURFACE_MANNINGS = {
@@ -69,101 +84,184 @@ DEFAULT_MANNINGS = Mannings(
 )
 
 
-class SectionRaw(BaseModel):
+class CsvWriter(Protocol):
+    """The parts of a csv.writer used to write out sections"""
+
+    def writerow(self, row: Iterable[Any]) -> Any:
+        ...
+
+    def writerows(self, rows: Iterable[Iterable[Any]]) -> None:
+        ...
+
+
+# Name and formatted manning value output for a missing code
+_NO_MANNING = ("", "")
+
+
+@dataclass(slots=True)
+class ManningsTable:
+    """Mannings flattened after loading into a name and pre-formatted manning value
+    for each code, with output resolved once per feature code"""
+
+    surface: dict[str, tuple[str, str]]
+    vegetation: dict[str, tuple[str, str]]
+    # Manning value, surface name and vegetation name keyed by feature code pair
+    resolved: dict[tuple[Optional[str], Optional[str]], tuple[str, str, str]] = field(
+        default_factory=dict, init=False, repr=False, compare=False
+    )
+
+    @staticmethod
+    def __table(beds: dict[str, BedManning]) -> dict[str, tuple[str, str]]:
+        return {
+            code: (bed.name, f"{bed.manning}" if bed.manning else "")
+            for code, bed in beds.items()
+        }
+
+    @classmethod
+    def from_mannings(cls, mannings: Mannings):
+        return cls(
+            surface=cls.__table(mannings.surface),
+            vegetation=cls.__table(mannings.vegetation),
+        )
+
+    def resolve(
+        self,
+        surface: Optional[str],
+        vegetation: Optional[str],
+    ) -> tuple[str, str, str]:
+        """Get the manning value, surface name and vegetation name for a feature code"""
+        key = (surface, vegetation)
+        resolved = self.resolved.get(key)
+
+        if resolved is None:
+            surface_name, surface_manning = self.surface.get(
+                surface, _NO_MANNING  # type: ignore
+            )
+            vegetation_name, vegetation_manning = self.vegetation.get(
+                vegetation, _NO_MANNING  # type: ignore
+            )
+
+            manning_str = ""
+
+            if surface is not None and vegetation is not None:
+                is_vegetation = vegetation != "NO"
+                manning_str = vegetation_manning if is_vegetation else surface_manning
+
+            resolved = (manning_str, surface_name, vegetation_name)
+            self.resolved[key] = resolved
+
+        return resolved
+
+
+@dataclass(slots=True)
+class SectionRaw:
     metadata: dict[str, list[Optional[str]]]
     cross_sections: list[list[str]]
 
 
-class CrossSection(BaseModel):
+NO_BANK = 0
+LEFT_BANK = 1
+RIGHT_BANK = 2
+# Bank side from the last character of a cross section level
+_BANK_SUFFIXES = {"L": LEFT_BANK, "R": RIGHT_BANK}
+# BANK column output, indexed by CrossSection.bank
+_BANK_NAMES = ("", "LEFT", "RIGHT")
+
+
+@dataclass(slots=True)
+class CrossSection:
     offset: float
     level: float
     feature_code: str
     easting: float
     northing: float
-    # From level last char
-    left: Optional[bool]
-    right: Optional[bool]
+    # From level last char, one of NO_BANK, LEFT_BANK or RIGHT_BANK
+    bank: int
+    # From feature code split on "*"
+    surface: Optional[str]
+    vegetation: Optional[str]
 
     @property
-    def __feature_code_split(self) -> Optional[Tuple[str, str]]:
-        codes = self.feature_code.strip("~*").split("*")
-        if len(codes) != 2:
-            return None
-        return codes[0], codes[1]
+    def left(self) -> Optional[bool]:
+        return None if self.bank == NO_BANK else self.bank == LEFT_BANK
 
     @property
-    def surface(self) -> Optional[str]:
-        return (
-            self.__feature_code_split[0]
-            if self.__feature_code_split is not None
-            else None
-        )
-
-    @property
-    def vegetation(self) -> Optional[str]:
-        return (
-            self.__feature_code_split[1]
-            if self.__feature_code_split is not None
-            else None
-        )
+    def right(self) -> Optional[bool]:
+        return None if self.bank == NO_BANK else self.bank == RIGHT_BANK
 
     @classmethod
-    def from_raw(cls, cross_raw: list[str], mannings: Mannings):
+    def __from_row(cls, cross_raw: list[str]):
 
         if len(cross_raw) != 5:
             raise ValueError(f"input array must be length 5, got {len(cross_raw)}")
 
-        offset = float(cross_raw[0])
-        level_code = cross_raw[1]
-        left: Optional[bool] = None
+        # Unpack once so each numeric column is indexed and converted exactly once
+        offset, level_code, feature_code, easting, northing = cross_raw
+        bank = _BANK_SUFFIXES.get(level_code[-1], NO_BANK)
 
-        if level_code[-1] == "L":
-            left = True
-        elif level_code[-1] == "R":
-            left = False
+        # If we're on a bank point, remove that last character so we have a valid float
+        level_str = level_code[:-1] if bank else level_code
 
-        right = (not left) if left is not None else None
+        surface: Optional[str]
+        vegetation: Optional[str]
+        surface, separator, vegetation = feature_code.strip("~*").partition("*")
 
-        # If we're on a bank point, remove that last character so we have a valid float
-        level_str = level_code[:-1] if (left or right) else level_code
+        # Only a code with exactly one surface and one vegetation part is split
+        if not separator or "*" in vegetation:
+            surface = vegetation = None
 
-        cross_section = cls(
-            offset=offset,
+        return cls(
+            offset=float(offset),
             level=float(level_str),
-            feature_code=cross_raw[2],
-            easting=float(cross_raw[3]),
-            northing=float(cross_raw[4]),
-            left=left,
-            right=right,
+            feature_code=feature_code,
+            easting=float(easting),
+            northing=float(northing),
+            bank=bank,
+            surface=surface,
+            vegetation=vegetation,
         )
 
-        if (
-            cross_section.vegetation
-            and mannings.vegetation.get(cross_section.vegetation) is None
-        ):
-            raise ValueError(
-                f"Did not understand feature code '{cross_section.vegetation}' for vegation manning."
-            )
-        if (
-            cross_section.surface
-            and mannings.surface.get(cross_section.surface) is None
+    @classmethod
+    def from_raw(cls, cross_raw: list[str], mannings: ManningsTable):
+        return cls.from_many_raw([cross_raw], mannings)[0]
+
+    @classmethod
+    def from_many_raw(
+        cls,
+        cross_raws: list[list[str]],
+        mannings: ManningsTable,
+    ) -> list["CrossSection"]:
+        """Build the cross sections of a section, checking each distinct feature code once"""
+        # Bind as locals so the loops below avoid repeated attribute lookups
+        from_row = cls.__from_row
+        surfaces = mannings.surface
+        vegetations = mannings.vegetation
+
+        cross_sections = [from_row(x) for x in cross_raws]
+
+        # Feature codes repeat heavily within a section, so deduplicate in row order
+        for surface, vegetation in dict.fromkeys(
+            (x.surface, x.vegetation) for x in cross_sections
         ):
-            raise ValueError(
-                f"Did not understand feature code '{cross_section.surface}' for surface manning."
-            )
-        return cross_section
+            if vegetation and vegetation not in vegetations:
+                raise ValueError(
+                    f"Did not understand feature code '{vegetation}' for vegation manning."
+                )
+            if surface and surface not in surfaces:
+                raise ValueError(
+                    f"Did not understand feature code '{surface}' for surface manning."
+                )
+
+        return cross_sections
 
 
-class Section(BaseModel):
+@dataclass(slots=True)
+class Section:
     date: str
     cross_sections: list[CrossSection]
     section_number: str
-
-    @property
-    def river_num(self) -> int:
-        number = self.section_number.split(".")[0]
-        return int(number)
-
+    # From section number before the "."
+    river_num: int
     chainage: float
     offset: float
     easting: float
@@ -172,10 +270,10 @@ class Section(BaseModel):
     ground: str
 
     @classmethod
-    def from_raw(cls, section_raw: SectionRaw, mannings: Mannings):
-        cross_sections = [
-            CrossSection.from_raw(x, mannings) for x in section_raw.cross_sections
-        ]
+    def from_raw(cls, section_raw: SectionRaw, mannings: ManningsTable):
+        cross_sections = CrossSection.from_many_raw(
+            section_raw.cross_sections, mannings
+        )
         date = section_raw.metadata["SECDATE"][0]
         offset = section_raw.metadata["SECBEARING"][0]
         newsec = section_raw.metadata["NEWSEC"]
@@ -187,124 +285,89 @@ class Section(BaseModel):
         northing = seccoords[1]
         ground = section_raw.metadata["BEDMATERIAL"][0]
 
-        values = [
-            date,
-            section_number,
-            chainage,
-            offset,
-            easting,
-            northing,
-            level,
-        ]
-        if any([x is None for x in values]):
+        if (
+            date is None
+            or section_number is None
+            or chainage is None
+            or offset is None
+            or easting is None
+            or northing is None
+            or level is None
+        ):
+            values = [
+                date,
+                section_number,
+                chainage,
+                offset,
+                easting,
+                northing,
+                level,
+            ]
             raise ValueError(f"Unexpected None found when parsing section: {values}")
 
         return cls(
-            date=date,  # type: ignore
+            date=date,
             cross_sections=cross_sections,
-            section_number=section_number,  # type: ignore
-            chainage=float(chainage),  # type: ignore
-            offset=float(offset),  # type: ignore
-            easting=float(easting),  # type: ignore
-            northing=float(northing),  # type: ignore
-            level=float(level),  # type: ignore
+            section_number=section_number,
+            river_num=int(section_number.split(".")[0]),
+            chainage=float(chainage),
+            offset=float(offset),
+            easting=float(easting),
+            northing=float(northing),
+            level=float(level),
             ground=ground or "",
         )
 
     def __name(self, riv_name_map: dict[int, str]) -> str:
-        short_name = riv_name_map[self.river_num]
-        chainage = round(self.chainage)
-        suffix = f"{chainage}".rjust(5, "0")
-        return f"{short_name}.{suffix}"
-
-    def __first_record(self, riv_name_map: dict[int, str]) -> str:
-        return ",".join(
-            [
-                "WLEVEL",
-                f"{self.section_number}",
-                self.__name(riv_name_map),
-                self.date,
-                f"{self.chainage}",
-                f"{self.offset}",
-                f"{self.level}",
-                f"{self.easting}",
-                f"{self.northing}",
-                "WATER",
-                "",
-                self.ground,
-                "",
-            ]
+        return f"{riv_name_map[self.river_num]}.{round(self.chainage):05d}"
+
+    def __first_row(self, prefix: tuple[str, str, str, float]) -> tuple:
+        return (
+            "WLEVEL",
+            *prefix,
+            self.offset,
+            self.level,
+            self.easting,
+            self.northing,
+            "WATER",
+            "",
+            self.ground,
+            "",
         )
 
-    def __cross_section_record(
+    def __cross_section_row(
         self,
-        riv_name_map: dict[int, str],
+        prefix: tuple[str, str, str, float],
         cross_section: CrossSection,
-        mannings: Mannings,
-    ) -> str:
-
-        bank: str
-        if cross_section.left is None and cross_section.right is None:
-            bank = ""
-        else:
-            bank = "LEFT" if cross_section.left else "RIGHT"
-
-        is_vegetation = cross_section.vegetation != "NO"
-
-        manning: Optional[float] = None
-
-        if (
-            cross_section.feature_code is not None
-            and cross_section.vegetation is not None
-            and cross_section.surface is not None
-        ):
-            manning = (
-                mannings.vegetation[cross_section.vegetation].manning
-                if is_vegetation
-                else mannings.surface[cross_section.surface].manning
-            )
-
-        return ",".join(
-            [
-                "BED",
-                f"{self.section_number}",
-                self.__name(riv_name_map),
-                self.date,
-                f"{self.chainage}",
-                f"{cross_section.offset}",
-                f"{cross_section.level}",
-                f"{cross_section.easting}",
-                f"{cross_section.northing}",
-                bank,
-                f"{manning}" if manning else "",
-                (
-                    mannings.surface[cross_section.surface].name
-                    if cross_section.surface
-                    else ""
-                ),
-                (
-                    mannings.vegetation[cross_section.vegetation].name
-                    if cross_section.vegetation
-                    else ""
-                ),
-            ]
+        mannings: ManningsTable,
+    ) -> tuple:
+        return (
+            "BED",
+            *prefix,
+            cross_section.offset,
+            cross_section.level,
+            cross_section.easting,
+            cross_section.northing,
+            _BANK_NAMES[cross_section.bank],
+            *mannings.resolve(cross_section.surface, cross_section.vegetation),
         )
 
-    def csv_records(
+    def write_csv(
         self,
+        writer: CsvWriter,
         riv_name_map: dict[int, str],
-        mannings: Mannings,
-    ) -> list[str]:
-        records: list[str] = []
-        records.append(self.__first_record(riv_name_map))
-
-        for cross_section in self.cross_sections:
-            records.append(
-                self.__cross_section_record(
-                    riv_name_map,
-                    cross_section,
-                    mannings,
-                )
-            )
+        mannings: ManningsTable,
+    ) -> None:
+        # Columns shared by every row in the section
+        prefix = (
+            self.section_number,
+            self.__name(riv_name_map),
+            self.date,
+            self.chainage,
+        )
 
-        return records
+        writer.writerow(self.__first_row(prefix))
+        writer.writerows(
+            self.__cross_section_row(prefix, cross_section, mannings)
+            for cross_section in self.cross_sections
+        )
@@ -1,4 +1,24 @@
+from csv import writer
+from io import StringIO
+
+import pytest
+from pydantic import ValidationError
+
 from sections import __version__
+from sections.cli import write_rivers_to_csv
+from sections.input import (
+    read_and_process_mannings,
+    read_sections,
+    read_short_rivername_mapping,
+)
+from sections.schema import (
+    DEFAULT_MANNINGS,
+    CrossSection,
+    Mannings,
+    ManningsTable,
+    Section,
+    SectionRaw,
+)
 
 
 def test_version():
@@ -6,3 +26,174 @@ def test_version():
     Only present to make sure the testing library is working.
     """
     assert __version__ == "1.0.0"
+
+
+def test_read_sections(tmp_path):
+    """Sections are split on NEWSEC with blank lines and whitespace removed"""
+    data = tmp_path / "sections.dat"
+    data.write_text(
+        "\n".join(
+            [
+                "NEWSEC,1.000,0.0,10.0,,",
+                "  XSS,0.0,5.0,~,1.0,2.0  ",
+                "",
+                "NEWSEC,1.001,25.0,10.0,,",
+                "XSS,0.0,5.0L,~,1.0,2.0",
+                "",
+            ]
+        )
+    )
+
+    assert list(read_sections(data)) == [
+        ["NEWSEC,1.000,0.0,10.0,,", "XSS,0.0,5.0,~,1.0,2.0"],
+        ["NEWSEC,1.001,25.0,10.0,,", "XSS,0.0,5.0L,~,1.0,2.0"],
+    ]
+
+
+def test_read_short_rivername_mapping(tmp_path):
+    """Only SHORT_RIVERNAME entries are read, keyed by their full river number"""
+    river_names = tmp_path / "river_names.ini"
+    river_names.write_text(
+        "\n".join(
+            [
+                "[RIVERS]",
+                "SHORT_RIVERNAME1=AFON",
+                "  SHORT_RIVERNAME12 = TAFF ",
+                "RIVERNAME1=Afon Fawr",
+            ]
+        )
+    )
+
+    assert read_short_rivername_mapping(river_names) == {1: "AFON", 12: "TAFF"}
+
+
+def test_cross_section_from_many_raw():
+    """Bank suffixes are removed from the level and feature codes are split"""
+    left, plain = CrossSection.from_many_raw(
+        [
+            ["1.5", "5.25L", "~GR*GS*", "300000.3", "200000.4"],
+            ["3.0", "5.5", "~", "300000.6", "200000.8"],
+        ],
+        ManningsTable.from_mannings(DEFAULT_MANNINGS),
+    )
+
+    assert (left.level, left.left, left.right) == (5.25, True, False)
+    assert (left.surface, left.vegetation) == ("GR", "GS")
+    assert (plain.level, plain.left, plain.right) == (5.5, None, None)
+    assert (plain.surface, plain.vegetation) == (None, None)
+
+
+def test_cross_section_from_many_raw_unknown_code():
+    with pytest.raises(ValueError, match="'ZZ' for surface manning"):
+        CrossSection.from_many_raw(
+            [["1.5", "5.25", "~ZZ*GS*", "300000.3", "200000.4"]],
+            ManningsTable.from_mannings(DEFAULT_MANNINGS),
+        )
+
+
+def test_section_write_csv():
+    """Rows match the CSV layout, with fields containing a comma quoted"""
+    mannings = ManningsTable.from_mannings(DEFAULT_MANNINGS)
+    section_raw = SectionRaw(
+        metadata={
+            "NEWSEC": ["1.001", "25.4", "10.0", None, None],
+            "SECDATE": ["2020-01-02", None, None, None, None],
+            "BEDMATERIAL": ["GRAVEL", None, None, None, None],
+            "SECBEARING": ["3.5", None, None, None, None],
+            "SECCOORDS": ["300001", "200001", None, None, None],
+        },
+        cross_sections=[
+            ["0.0", "5.5L", "~CO*GS*", "300000.0", "200000.0"],
+            ["1.5", "5.0", "~GR*NO*", "300000.3", "200000.4"],
+            ["3.0", "5.25", "~", "300000.6", "200000.8"],
+            ["4.5", "5.75R", "~CC*NO*", "300000.9", "200001.2"],
+        ],
+    )
+    buffer = StringIO()
+
+    Section.from_raw(section_raw, mannings).write_csv(
+        writer(buffer, lineterminator="\n"), {1: "AFON, FAWR"}, mannings
+    )
+
+    prefix = '1.001,"AFON, FAWR.00025",2020-01-02,25.4'
+    assert buffer.getvalue().splitlines() == [
+        f"WLEVEL,{prefix},3.5,10.0,300001.0,200001.0,WATER,,GRAVEL,",
+        f"BED,{prefix},0.0,5.5,300000.0,200000.0,LEFT,0.07,cobble,Grass",
+        f"BED,{prefix},1.5,5.0,300000.3,200000.4,,0.035,gravel,",
+        f"BED,{prefix},3.0,5.25,300000.6,200000.8,,,,",
+        f"BED,{prefix},4.5,5.75,300000.9,200001.2,RIGHT,0.015,concrete,",
+    ]
+
+
+def test_mannings_validate_json_extra_key():
+    with pytest.raises(ValidationError) as err:
+        Mannings.validate_json(
+            b'{"surface": {"GR": {"name": "gravel", "manning": 0.035, "z": 1}},'
+            b' "vegetation": {}}'
+        )
+
+    assert [(x["loc"], x["type"]) for x in err.value.errors()] == [
+        (("surface", "GR", "z"), "unexpected_keyword_argument")
+    ]
+
+
+def test_read_and_process_mannings_override(tmp_path):
+    """Overrides are merged into the table without changing the defaults"""
+    mannings_file = tmp_path / "mannings.json"
+    mannings_file.write_text(
+        '{"surface": {"GR": {"name": "coarse gravel", "manning": 0.04}},'
+        ' "vegetation": {}}'
+    )
+    default_surface = dict(DEFAULT_MANNINGS.surface)
+
+    mannings = read_and_process_mannings(mannings_file)
+
+    assert mannings.surface["GR"] == ("coarse gravel", "0.04")
+    assert mannings.surface["CO"] == ("cobble", "0.04")
+    assert DEFAULT_MANNINGS.surface == default_surface
+
+
+def _section(section_number: str, mannings: ManningsTable) -> Section:
+    section_raw = SectionRaw(
+        metadata={
+            "NEWSEC": [section_number, "25.4", "10.0", None, None],
+            "SECDATE": ["2020-01-02", None, None, None, None],
+            "BEDMATERIAL": ["GRAVEL", None, None, None, None],
+            "SECBEARING": ["3.5", None, None, None, None],
+            "SECCOORDS": ["300001", "200001", None, None, None],
+        },
+        cross_sections=[["0.0", "5.5L", "~CO*GS*", "300000.0", "200000.0"]],
+    )
+    return Section.from_raw(section_raw, mannings)
+
+
+def test_write_rivers_to_csv_shared_short_name(tmp_path):
+    """Rivers sharing a short name write one file, with the last river winning"""
+    mannings = ManningsTable.from_mannings(DEFAULT_MANNINGS)
+    mapping = {1: "AFON", 2: "AFON"}
+    output_dir = tmp_path / "output"
+    expected_dir = tmp_path / "expected"
+    output_dir.mkdir()
+    expected_dir.mkdir()
+    first_river = [_section("1.000", mannings)]
+    second_river = [_section("2.000", mannings)]
+
+    write_rivers_to_csv(
+        mapping, {1: first_river, 2: second_river}, output_dir, mannings
+    )
+    write_rivers_to_csv(mapping, {2: second_river}, expected_dir, mannings)
+
+    assert [x.name for x in output_dir.iterdir()] == ["AFON.csv"]
+    assert (output_dir / "AFON.csv").read_text() == (
+        expected_dir / "AFON.csv"
+    ).read_text()
+
+
+def test_mannings_table_resolve_cache_not_compared():
+    """The resolve cache is not part of the table's value"""
+    table = ManningsTable.from_mannings(DEFAULT_MANNINGS)
+    other = ManningsTable.from_mannings(DEFAULT_MANNINGS)
+
+    assert table.resolve("GR", "NO") == ("0.035", "gravel", "")
+    assert table == other
+    assert "resolved" not in repr(table)